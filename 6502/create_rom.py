@@ -1,26 +1,16 @@
-def reverse_binary_words(binary_data: bytes) -> bytes:
-    """
-    Reverse the order of bytes in each 16-bit word from the binary data.
-    
-    For every two bytes, swap their order. If the last chunk is a single byte,
-    append it as is.
-    """
-    result = bytearray()
-    for i in range(0, len(binary_data), 2):
-        # Check if two bytes are available
-        if i + 1 < len(binary_data):
-            result.extend([binary_data[i+1], binary_data[i]])
-        else:
-            # If odd number of bytes, just append the last one
-            result.append(binary_data[i])
-    return bytes(result)
+# The ROM is written with the bytes of every 16-bit word swapped. Swapping a
+# uniform 0xEA (NOP) fill is a no-op, so the image is built directly in the
+# swapped layout: a byte at address addr is stored at addr ^ 1.
+rom = bytearray(b'\xea' * 32768)
 
-####
+# (address, value) patches on top of the NOP fill, in logical address order
+patches = [
+    (0x7FFC, 0x00),  # reset vector 0x8000
+    (0x7FFD, 0x80),
+]
 
-rom = bytearray([0xea] * 32768)
-
-rom[0x7FFC] = 0x00
-rom[0x7FFD] = 0x80
+for addr, value in patches:
+    rom[addr ^ 1] = value
 
 with open("rom.bin", "wb") as f: 
-    f.write(reverse_binary_words(rom))
+    f.write(rom)
@@ -1,18 +1,60 @@
 import click
 import serial
+import sys
 import time
+from collections import deque
 from tqdm import tqdm
 from typing import Tuple
 
 BAUD_RATE = 115200
+# Usable size of the Nano's 64 byte HardwareSerial RX ring buffer.
+RX_BUFFER_SIZE = 63
+# Must match CHUNK_SIZE in programmer.c: the firmware sends one ACK per CHUNK_SIZE bytes.
+# 64 does not work, it does not fit in the RX buffer.
+CHUNK_SIZE = 48
+# Number of chunks that may be sent before their ACK arrives. While the Arduino
+# writes one chunk to the EEPROM the others wait in its RX buffer, so the window
+# is as large as the buffer allows: 2 for 48 byte chunks, 4 for 16 byte chunks.
+WINDOW = 1 + RX_BUFFER_SIZE // CHUNK_SIZE
+
+# Seconds a single serial read or write may block before it is given up on.
+SERIAL_TIMEOUT = 5
+# Upper bound in seconds for writing one EEPROM byte, including the firmware's 6 ms delay.
+BYTE_WRITE_TIME = 0.01
+
+# Commands understood by the firmware (see loop() in programmer.c). Numeric
+# arguments follow the command as decimal ASCII, each terminated by a newline.
+CMD_READ = b'READ\n'
+CMD_ERASE = b'ERASE\n'
+CMD_WRITE = b'WRITE\n'
+CMD_WRITE_BYTE = b'WRITE_BYTE\n'
+CMD_READ_BYTE = b'READ_BYTE\n'
+
+def parse_int(value: str) -> int:
+    """Parse a number given in hex (e.g., 0x7FFF) or decimal."""
+    return int(value, 0)
 
 def init_serial(serial_port: str) -> Tuple[str, serial.Serial]:
     """Initialize serial connection and wait for Arduino to start."""
-    ser = serial.Serial(serial_port, BAUD_RATE)
+    ser = serial.Serial(serial_port, BAUD_RATE, timeout=SERIAL_TIMEOUT, write_timeout=SERIAL_TIMEOUT)
     time.sleep(2)
-    text = ser.readline().decode('utf-8').strip()
+    text = read_line(ser).decode('utf-8').strip()
     return text, ser
 
+def read_line(ser: serial.Serial, attempts: int = 3) -> bytes:
+    """Read a newline terminated line from the Arduino.
+
+    Each attempt waits up to SERIAL_TIMEOUT seconds. A partial line returned on
+    timeout is kept and completed by the next attempt. Raises TimeoutError when
+    no complete line arrived after all attempts.
+    """
+    line = b''
+    for _ in range(attempts):
+        line += ser.readline()
+        if line.endswith(b'\n'):
+            return line
+    raise TimeoutError(f"No response from Arduino within {attempts * SERIAL_TIMEOUT} seconds")
+
 @click.group()
 @click.option('--serial-port', '-p', required=True, help="Serial port to use")
 @click.pass_context
@@ -29,16 +71,26 @@ def read(ctx, bytes_to_read: str):
     """Read contents of EEPROM with a limit eg. 0x7FFF or 32768"""
     serial_port = ctx.obj['serial_port']
     _, ser = init_serial(serial_port)
-    ser.write(b'READ\n')
-    length = int(bytes_to_read, 16) if '0x' in bytes_to_read else int(bytes_to_read)
-    ser.write(f"{length}\n".encode())
-    while True:
-        if ser.in_waiting:
-            response = ser.readline().decode('utf-8').strip()
+    ser.write(CMD_READ)
+    length = parse_int(bytes_to_read)
+    ser.write(f"{length}\n".encode('ascii'))
+    # Print the hexdump in batches of lines instead of one write per line.
+    lines = []
+    try:
+        while True:
+            response = read_line(ser).decode('utf-8').strip()
             if response == "---END---":
                 break
-            print(response)
-    ser.close()
+            lines.append(response)
+            if len(lines) >= 256:
+                sys.stdout.write('\n'.join(lines) + '\n')
+                lines.clear()
+    finally:
+        # Also print what was received when the Arduino stops responding mid-dump.
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+        ser.close()
 
 @cli.command()
 @click.argument('bytes_to_erase', type=str, required=True)
@@ -47,15 +99,16 @@ def erase(ctx, bytes_to_erase: str):
     """Erase EEPROM"""
     serial_port = ctx.obj['serial_port']
     _, ser = init_serial(serial_port)
-    ser.write(b'ERASE\n')
-    length = int(bytes_to_erase, 16) if '0x' in bytes_to_erase else int(bytes_to_erase)
-    ser.write(f"{length}\n".encode())
+    ser.write(CMD_ERASE)
+    length = parse_int(bytes_to_erase)
+    ser.write(f"{length}\n".encode('ascii'))
+    # The firmware only answers once the whole range has been erased.
+    attempts = 1 + int((length + 1) * BYTE_WRITE_TIME / SERIAL_TIMEOUT)
     while True:
-        if ser.in_waiting:
-            response = ser.readline().decode('utf-8').strip()
-            if response == "---END---":
-                break
-            print(response)
+        response = read_line(ser, attempts).decode('utf-8').strip()
+        if response == "---END---":
+            break
+        print(response)
     ser.close()
 
 def reverse_binary_words(binary_data: bytes) -> bytes:
@@ -66,12 +119,14 @@ def reverse_binary_words(binary_data: bytes) -> bytes:
     append it as is. This is due to the fact that Python reads big endian byte order from
     the file which means that the order in which the bytes are read is reversed.
     """
-    result = bytearray()
-    for i in range(0, len(binary_data), 2):
-        if i + 1 < len(binary_data):
-            result.extend([binary_data[i+1], binary_data[i]])
-        else:
-            result.append(binary_data[i])
+    n = len(binary_data) & ~1
+    result = bytearray(len(binary_data))
+    data = memoryview(binary_data)
+    result[0:n:2] = data[1:n:2]
+    result[1:n:2] = data[0:n:2]
+    # If odd number of bytes, just append the last one
+    if len(binary_data) & 1:
+        result[-1] = binary_data[-1]
     return bytes(result)
 
 @cli.command()
@@ -82,7 +137,7 @@ def write(ctx, filename: str, limit: str):
     """Write binary file to EEPROM with an optional limit on the number of bytes to write (ex. 0xFF)"""
     serial_port = ctx.obj['serial_port']
     _, ser = init_serial(serial_port)
-    ser.write(b'WRITE\n')
+    ser.write(CMD_WRITE)
     
     with open(filename, 'rb') as f:
         read_data = f.read()
@@ -92,36 +147,45 @@ def write(ctx, filename: str, limit: str):
 
     # Determine the total length based on the limit option if provided.
     if limit is not None:
-        limit_num = int(limit, 16) if limit.startswith("0x") else int(limit)
+        limit_num = parse_int(limit)
         total_length = min(len(binary_data), limit_num)
     else:
         total_length = len(binary_data)
 
     print("Length:", total_length)
-    ser.write(f"{total_length}\n".encode())
+    ser.write(f"{total_length}\n".encode('ascii'))
     ser.flush()
     time.sleep(0.1)
     ser.reset_input_buffer()
 
-    CHUNK_SIZE = 48
     from tqdm import tqdm
-    with tqdm(total=total_length, unit='B', unit_scale=True, desc="Writing", ncols=80) as progress:
+    in_flight = deque()
+    failed = False
+    with tqdm(total=total_length, unit='B', unit_scale=True, desc="Writing", ncols=80,
+              mininterval=0.2) as progress:
         for i in range(0, total_length, CHUNK_SIZE):
             chunk = binary_data[i:i+CHUNK_SIZE]
             ser.write(chunk)
-            ser.flush()
-            ack = ser.readline().decode('utf-8').strip()
-            if ack != "ACK":
-                print(f"Did not receive ACK after chunk at offset {i}. Received: {ack}")
+            in_flight.append((i, len(chunk)))
+            # Wait for an ACK only when the window is full, and for all of them after the last chunk.
+            last_chunk = i + CHUNK_SIZE >= total_length
+            while in_flight and (len(in_flight) == WINDOW or last_chunk):
+                offset, size = in_flight.popleft()
+                # compare the raw line, only decode it for the error message
+                ack = read_line(ser).strip()
+                if ack != b"ACK":
+                    print(f"Did not receive ACK after chunk at offset {offset}. Received: {ack.decode('utf-8')}")
+                    failed = True
+                    break
+                progress.update(size)
+            if failed:
                 break
-            progress.update(len(chunk))
-    
+
     while True:
-        if ser.in_waiting:
-            response = ser.readline().decode('utf-8').strip()
-            if response == "---END---":
-                break
-            print(response)
+        response = read_line(ser).decode('utf-8').strip()
+        if response == "---END---":
+            break
+        print(response)
     ser.close()
 
 @cli.command()
@@ -135,26 +199,25 @@ def write_byte(ctx, address: str, data: str):
     """
     serial_port = ctx.obj['serial_port']
     _, ser = init_serial(serial_port)
-    ser.write(b'WRITE_BYTE\n')
+    ser.write(CMD_WRITE_BYTE)
     
     # Convert address and data to integer.
-    addr = int(address, 16) if '0x' in address.lower() else int(address)
-    dat = int(data, 16) if '0x' in data.lower() else int(data)
+    addr = parse_int(address)
+    dat = parse_int(data)
     
     # Send address and data, each terminated by a newline.
-    ser.write(f"{addr}\n".encode())
-    ser.write(f"{dat}\n".encode())
+    ser.write(f"{addr}\n".encode('ascii'))
+    ser.write(f"{dat}\n".encode('ascii'))
     ser.flush()
     
     # Wait for ACK from Arduino.
     while True:
-        if ser.in_waiting:
-            response = ser.readline().decode('utf-8').strip()
-            if response == "ACK":
-                print("Byte written.")
-                break
-            else:
-                print("Received:", response)
+        response = read_line(ser).decode('utf-8').strip()
+        if response == "ACK":
+            print("Byte written.")
+            break
+        else:
+            print("Received:", response)
     ser.close()
 
 @cli.command()
@@ -167,15 +230,15 @@ def read_byte(ctx, address: str):
     """
     serial_port = ctx.obj['serial_port']
     _, ser = init_serial(serial_port)
-    ser.write(b'READ_BYTE\n')
+    ser.write(CMD_READ_BYTE)
     
     # Convert address to integer (supports hex or decimal)
-    addr = int(address, 16) if '0x' in address.lower() else int(address)
-    ser.write(f"{addr}\n".encode())
+    addr = parse_int(address)
+    ser.write(f"{addr}\n".encode('ascii'))
     ser.flush()
     
     # Wait for the response from Arduino
-    response = ser.readline().decode('utf-8').strip()
+    response = read_line(ser).decode('utf-8').strip()
     print(response)
     ser.close()
 